@@ -3,18 +3,63 @@
 import sys
 import os
 import json
+import hashlib
+import functools
 import re  # Regular expressions for link conversion
 import time  # For sleep functionality
 import logging
 import configparser
 import argparse
-from jira import JIRA
+import signal
+from collections import deque
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from jira import JIRA, JIRAError
 from dotenv import load_dotenv  # For loading .env file
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # Optional, faster JSON parsing and encoding of the issue mapping
+except ImportError:
+    orjson = None
+
+# Map custom statuses to Jira statuses
+STATUS_MAPPING = {
+    'TODO': 'Backlog',
+    'DOING': 'In Progress',
+    'DONE': 'Done'
+}
+
+# Status new issues start in with the default workflow, assumed by the dry-run planner
+NEW_ISSUE_STATUS = 'Backlog'
+
+# Jira issue types, shared by every node instead of a string per node
+EPIC = 'Epic'
+TASK = 'Task'
+SUBTASK = 'Sub-task'
+
+# Splits a (tab-expanded) line into its indentation, optional '- ' bullet, optional
+# status keyword (only recognised after a bullet) and the remaining content. The body ends
+# at its last non-space character, a lazy body followed by \s*$ would backtrack quadratically
+# on long runs of spaces.
+LINE_RE = re.compile(
+    r'(?P<indent> *)'
+    r'(?:(?P<dash>-) +(?=\S)(?:(?P<status>TODO|DOING|DONE)(?:\s+|$))?)?'
+    r'(?P<body>(?:.*\S)?)\s*$'
+)
 
 class Node:
+    # Fixed attribute slots instead of a per-instance __dict__
+    __slots__ = (
+        'indent', 'line', 'children', 'parent', 'type', 'status',
+        'description_lines', 'relations', 'jira_issue', 'path', 'description_text',
+        'existing_key', 'synced_hash', 'prefetched_issue',
+    )
+
     def __init__(self, indent, line):
         self.indent = indent
-        self.line = ''
+        self.line = line
         self.children = []
         self.parent = None
         self.type = None  # Epic, Task, Sub-task
@@ -24,33 +69,454 @@ class Node:
         self.jira_issue = None
         self.path = ''
         self.description_text = ''  # Stores the final description text
+        self.existing_key = None  # Issue key from the mapping, set before syncing
+        self.synced_hash = None  # Sync hash from the mapping
+        self.prefetched_issue = None  # Issue fetched by the JQL prefetch
+
+# Regular expression pattern to find markdown links: [text](URL)
+_MD_LINK_RE = re.compile(r'\[([^\]]+)\]\(([^\)]+)\)')
+
+# Issue keys referenced in a relation line, e.g. #PROJ-123
+_REL_RE = re.compile(r'#([A-Z]+-\d+)')
+
+# Lines at least this long are converted without caching, to bound the cache's memory use
+_LINK_CACHE_MAX_LEN = 4096
+
+# Logseq templates repeat the same description lines across many nodes
+@functools.lru_cache(maxsize=4096)
+def _convert_markdown_links_cached(text):
+    return _MD_LINK_RE.sub(r'[\1|\2]', text)
 
 def convert_markdown_links_to_jira(text):
-    # Regular expression pattern to find markdown links: [text](URL)
-    pattern = r'\[([^\]]+)\]\(([^\)]+)\)'
-    replacement = r'[\1|\2]'
-    return re.sub(pattern, replacement, text)
+    if len(text) < _LINK_CACHE_MAX_LEN:
+        return _convert_markdown_links_cached(text)
+    return _MD_LINK_RE.sub(r'[\1|\2]', text)
 
 def build_description_text(description_lines):
     if not description_lines:
         return ''
     # Find the minimum indentation level among description lines
     min_indent = min(indent for indent, _ in description_lines)
-    # Adjust lines to have relative indentation and convert to Jira nested list syntax
+    # Adjust lines to have relative indentation and convert to Jira nested list syntax.
+    # Links are converted line by line here, so the joined text is never rewritten.
     adjusted_lines = []
     for indent, line in description_lines:
         relative_indent = (indent - min_indent) // 4  # Assuming 4 spaces per level
         # Use multiple '*' for nested lists in Jira
         bullet = '*' * (relative_indent + 1)
-        adjusted_line = f"{bullet} {line}"
+        adjusted_line = f"{bullet} {convert_markdown_links_to_jira(line)}"
         adjusted_lines.append(adjusted_line)
     return '\n'.join(adjusted_lines)
 
+# HTTP statuses worth retrying: rate limited or a temporary server-side failure
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Network failures worth retrying, the request may not have reached Jira at all
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+def retry(func, *args, attempts=3, base_delay=1.0, **kwargs):
+    # Calls func(*args, **kwargs), retrying transient Jira and network errors with exponential
+    # backoff. Only use this for requests that are safe to repeat.
+    for attempt in range(1, attempts + 1):
+        delay = base_delay * 2 ** (attempt - 1)
+        try:
+            return func(*args, **kwargs)
+        except JIRAError as e:
+            if attempt == attempts or e.status_code not in RETRY_STATUS_CODES:
+                raise
+            # Honour the server's Retry-After if it asks for a longer wait
+            retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+            try:
+                delay = max(delay, float(retry_after or 0))
+            except ValueError:
+                pass
+            logging.warning(f"Jira request failed with HTTP {e.status_code}, retrying in {delay:g}s")
+        except RETRY_EXCEPTIONS as e:
+            if attempt == attempts:
+                raise
+            logging.warning(f"Jira request failed ({e}), retrying in {delay:g}s")
+        time.sleep(delay)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_whitespace(text):
+    return _WHITESPACE_RE.sub(' ', (text or '').strip())
+
+def get_linked_keys(issue):
+    # Keys of the issues already linked to issue with a 'Relates' link, in either direction
+    linked_keys = set()
+    # Issues that couldn't be fetched after creation only carry their key
+    for link in getattr(getattr(issue, 'fields', None), 'issuelinks', None) or []:
+        if link.type.name != 'Relates':
+            continue
+        other_issue = getattr(link, 'outwardIssue', None) or getattr(link, 'inwardIssue', None)
+        if other_issue:
+            linked_keys.add(other_issue.key)
+    return linked_keys
+
+def compute_sync_hash(node):
+    # Fingerprint of everything pushed to Jira for a node, used to skip unchanged issues
+    data = '\0'.join((node.line, node.description_text, node.status or ''))
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+def parse_logseq(lines):
+    # Builds the typed node tree from an iterable of input lines (e.g. an open file) and returns
+    # the root nodes. Doesn't touch Jira, raises ValueError if the tree is nested too deeply.
+    in_logbook = False
+    stack = []
+    root_nodes = []
+    current_node = None
+
+    for line in lines:
+        # Handle :LOGBOOK: and :END: on the raw line, before any other work. Most lines have
+        # no colon at all, which rules out both markers with a single scan.
+        if ':' in line:
+            if ':LOGBOOK:' in line:
+                in_logbook = True
+                continue
+            if ':END:' in line:
+                in_logbook = False
+                continue
+        if in_logbook:
+            continue
+
+        # Only tab-indented lines need expanding, the membership test is cheaper than the call
+        if '\t' in line:
+            line = line.expandtabs(4)
+
+        # Split the line into indentation, bullet, status and content in one match
+        m = LINE_RE.match(line)
+        indent = len(m.group('indent'))
+        status = m.group('status')
+        content = m.group('body')
+
+        if status:
+            # It's a new node
+            node = Node(indent, content)
+            node.status = sys.intern(status)  # Share one string object per status
+
+            # Determine parent node
+            while stack and indent <= stack[-1].indent:
+                stack.pop()
+            if stack:
+                parent = stack[-1]
+                node.parent = parent
+                parent.children.append(node)
+            else:
+                root_nodes.append(node)
+            stack.append(node)
+            current_node = node
+
+            # Check for levels beyond sub-task
+            level = len(stack)
+            if level > 3:
+                raise ValueError("Tickets beyond sub-task detected")
+        elif not content:
+            # Skip if line is empty
+            continue
+        elif content.startswith('#'):
+            # It's a relation
+            if current_node:
+                current_node.relations.append(content)
+            else:
+                logging.warning(f"Relation '{content}' found with no parent node.")
+        elif current_node:
+            # It's a description line
+            current_node.description_lines.append((indent, content))
+
+    # Assign types to nodes and compute paths
+    assign_types_and_paths(root_nodes)
+    return root_nodes
+
+# Issue type by tree level (roots are level 1)
+TYPE_BY_LEVEL = (None, EPIC, TASK, SUBTASK)
+
+def assign_types_and_paths(root_nodes):
+    # Breadth-first walk, so deep trees cannot hit the recursion limit
+    queue = deque((root, 1, '') for root in root_nodes)
+    while queue:
+        node, level, parent_path = queue.popleft()
+        node.type = TYPE_BY_LEVEL[level]
+        node.path = f"{parent_path}/{node.line}"
+        # Build the description text here
+        node.description_text = build_description_text(node.description_lines)
+        queue.extend((child, level + 1, node.path) for child in node.children)
+
+def group_by_level(root_nodes):
+    # Returns [[roots], [their children], [grandchildren]], so parents always come first
+    levels = []
+    level = list(root_nodes)
+    while level:
+        levels.append(level)
+        level = [child for node in level for child in node.children]
+    return levels
+
+def get_target_status(node, current_status):
+    # The Jira status node's issue should be moved to, None if it is already there or the node
+    # has no mapped status. Shared by the sync and the planner, so they agree on transitions.
+    jira_status = STATUS_MAPPING.get(node.status)
+    if jira_status == current_status:
+        return None
+    return jira_status
+
+def get_new_link_keys(node, linked_keys):
+    # Keys from node's relations that aren't in linked_keys, in order and without duplicates
+    linked_keys = set(linked_keys)
+    new_keys = []
+    for relation in node.relations:
+        for key in _REL_RE.findall(relation):
+            if key not in linked_keys:
+                linked_keys.add(key)
+                new_keys.append(key)
+    return new_keys
+
+def plan_operations(root_nodes, issue_mapping):
+    # Lists the Jira changes a sync would make as (operation, payload) tuples, based only on the
+    # local tree and mapping. Updates are candidates: the sync skips them if Jira already matches.
+    # Links are only planned for new issues, existing issues are assumed to have theirs already.
+    operations = []
+    for level in group_by_level(root_nodes):
+        for node in level:
+            entry = issue_mapping.get(node.path)
+            if not entry:
+                operations.append(('create', {'path': node.path, 'type': node.type, 'summary': node.line}))
+                jira_status = get_target_status(node, NEW_ISSUE_STATUS)
+                if jira_status:
+                    operations.append(('transition', {'path': node.path, 'status': jira_status}))
+                for key in get_new_link_keys(node, ()):
+                    operations.append(('link', {'path': node.path, 'key': key}))
+            elif entry.get('hash') != compute_sync_hash(node):
+                operations.append(('update', {'path': node.path, 'key': entry['key'], 'status': STATUS_MAPPING.get(node.status)}))
+    return operations
+
+# Transition IDs per (project key, issue type, current status), mapping status name -> transition ID.
+# Available transitions and their IDs depend on the status an issue is in, so they aren't merged.
+_transition_cache = {}
+_transition_cache_lock = threading.Lock()
+
+def get_transition_id(jira, issue, project_key, issue_type, status_name):
+    cache_key = (project_key, issue_type, issue.fields.status.name)
+    with _transition_cache_lock:
+        transitions = _transition_cache.get(cache_key)
+    if transitions is None:
+        transitions = {t['name']: t['id'] for t in retry(jira.transitions, issue)}
+        with _transition_cache_lock:
+            _transition_cache[cache_key] = transitions
+    return transitions.get(status_name)
+
+def transition_issue_to_status(jira, issue, project_key, issue_type, status_name):
+    # Returns True if the issue was transitioned, False if no matching transition exists or
+    # Jira keeps rejecting it. A rejected transition never counts as a failed update.
+    for attempt in range(2):
+        transition_id = get_transition_id(jira, issue, project_key, issue_type, status_name)
+        if not transition_id:
+            return False
+        try:
+            retry(jira.transition_issue, issue, transition_id)
+            return True
+        except JIRAError as e:
+            if e.status_code != 400:
+                raise
+            # The cached transition is no longer valid, refetch the transitions and try once more
+            with _transition_cache_lock:
+                _transition_cache.pop((project_key, issue_type, issue.fields.status.name), None)
+            logging.warning(f"Jira rejected transition of {issue.key} to {status_name}: {e.text}")
+    return False
+
+# Epic custom field IDs used when the field list cannot be fetched from Jira
+DEFAULT_EPIC_NAME_FIELD = 'customfield_10011'
+DEFAULT_EPIC_LINK_FIELD = 'customfield_10014'
+
+def find_field_id(fields, name):
+    # Returns the ID of the field called name, or None if this Jira instance has no such field
+    return next((field['id'] for field in fields if field['name'] == name), None)
+
+# Read buffer for streaming the input file, larger than the default to cut down on read calls
+INPUT_BUFFER_SIZE = 1 << 16
+
+# Issue fields read when syncing, so Jira doesn't return the full issue payload
+SYNC_FIELDS = 'summary,description,status,assignee,issuelinks'
+
+# Issue keys per JQL search when prefetching (Jira Cloud caps search results at 100)
+PREFETCH_BATCH_SIZE = 100
+
+def prefetch_issues(jira, issue_keys):
+    # Returns {issue key: Issue}; keys that could not be fetched are simply missing
+    prefetched = {}
+    for i in range(0, len(issue_keys), PREFETCH_BATCH_SIZE):
+        batch = issue_keys[i:i + PREFETCH_BATCH_SIZE]
+        try:
+            issues = retry(
+                jira.search_issues,
+                f"key in ({','.join(batch)})",
+                maxResults=len(batch),
+                fields=SYNC_FIELDS,
+                validate_query=False,  # Don't fail the whole batch on deleted issues
+            )
+        except Exception as e:
+            logging.warning(f"Error prefetching issues, falling back to per-issue requests: {e}")
+            continue
+        prefetched.update((issue.key, issue) for issue in issues)
+    return prefetched
+
+# Maximum number of issues per bulk create request (the Jira limit is 50)
+BULK_CREATE_BATCH_SIZE = 50
+
+def load_issue_mapping(issue_mapping_file):
+    if not os.path.exists(issue_mapping_file):
+        return {}
+    try:
+        # Read raw bytes, both parsers decode UTF-8 themselves
+        with open(issue_mapping_file, 'rb') as f:
+            data = f.read()
+        issue_mapping = orjson.loads(data) if orjson else json.loads(data)
+    except Exception as e:
+        logging.error(f"Error reading issue mapping file '{issue_mapping_file}': {e}")
+        return {}
+    # Older mapping files store bare issue keys instead of {"key": ..., "hash": ...}
+    return {
+        path: entry if isinstance(entry, dict) else {'key': entry, 'hash': None}
+        for path, entry in issue_mapping.items()
+    }
+
+def save_issue_mapping(issue_mapping_file, issue_mapping):
+    # Write to a temporary file and swap it in, so a crash mid-write cannot corrupt the mapping
+    tmp_file = issue_mapping_file + '.tmp'
+    if orjson:
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(issue_mapping, option=orjson.OPT_SORT_KEYS))
+    else:
+        with open(tmp_file, 'w') as f:
+            json.dump(issue_mapping, f, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_file, issue_mapping_file)
+
+# Journal lines after which the journal is compacted into the mapping file
+JOURNAL_COMPACT_LINES = 1000
+
+class MappingJournal:
+    # Append-only log of issue mapping changes next to the mapping file, so issues created
+    # during a run are never forgotten if the process dies before the run ends. Each line is
+    # {"path": ..., "entry": {"key": ..., "hash": ...}}, or an entry of null for a removal.
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.line_count = 0
+        self.needs_newline = False
+
+    def replay(self, issue_mapping):
+        self.line_count = 0
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                # A crash mid-append can leave a torn last line, finish it before appending again
+                self.needs_newline = not line.endswith('\n')
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    continue
+                self.line_count += 1
+                if change['entry'] is None:
+                    issue_mapping.pop(change['path'], None)
+                else:
+                    issue_mapping[change['path']] = change['entry']
+
+    def append(self, path, entry):
+        with open(self.journal_file, 'a') as f:
+            if self.needs_newline:
+                f.write('\n')
+                self.needs_newline = False
+            f.write(json.dumps({'path': path, 'entry': entry}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.line_count += 1
+
+    def truncate(self):
+        # Only call this once the mapping file holds every journaled change
+        open(self.journal_file, 'w').close()
+        self.line_count = 0
+        self.needs_newline = False
+
+class RateLimiter:
+    # Spaces out Jira requests to at most rate_per_minute, shared by all worker threads
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute
+        self.next_allowed = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        # Reserve the next free slot, then sleep outside the lock until it arrives
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_allowed - now
+            self.next_allowed = max(now, self.next_allowed) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def postpone(self, seconds):
+        with self.lock:
+            self.next_allowed = max(self.next_allowed, time.monotonic() + seconds)
+
+    def on_response(self, response, *args, **kwargs):
+        # Jira sends Retry-After when it is throttling us, hold off all further requests
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                self.postpone(float(retry_after))
+            except ValueError:
+                pass
+        return response
+
+    def install(self, session):
+        # Throttle at the session level, so calls made through Issue objects (e.g. issue.update) are covered too
+        request = session.request
+
+        def throttled_request(*args, **kwargs):
+            self.wait()
+            return request(*args, **kwargs)
+
+        session.request = throttled_request
+        session.hooks['response'].append(self.on_response)
+
+def read_jira_settings():
+    # Get Jira credentials and project key from environment variables
+    jira_server = os.environ.get('JIRA_SERVER')
+    jira_user = os.environ.get('JIRA_USER')
+    jira_token = os.environ.get('JIRA_TOKEN')
+    project_key = os.environ.get('JIRA_PROJECT_KEY')
+    # Number of concurrent Jira requests per tree level (1 disables threading)
+    max_workers = int(os.environ.get('JIRA_WORKERS', '8'))
+
+    if not all([jira_server, jira_user, jira_token, project_key]):
+        logging.error("Jira credentials and project key must be set in the .env file.")
+        sys.exit(1)
+    return jira_server, jira_user, jira_token, project_key, max_workers
+
+def get_mtime_ns(path):
+    # Returns None for a missing file, so its later creation counts as a change
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def create_jira_client(jira_server, jira_user, jira_token, pool_size):
+    # retry() is the only retry layer. The session's own retries are turned off, they would
+    # stack with it and also repeat POSTs that create issues.
+    jira = retry(JIRA, {'server': jira_server}, basic_auth=(jira_user, jira_token), max_retries=0)
+    session = jira._session
+    session.headers.update({'Accept': 'application/json'})
+    # Keep a pooled connection per worker thread
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return jira
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Create or update Jira issues from input file.')
     parser.add_argument('input_file', nargs='?', default='input.txt', help='Path to the input file.')
     parser.add_argument('--config', default='/root/config.ini', help='Path to the configuration file.')
+    parser.add_argument('--rate-per-minute', type=float, help='Maximum number of Jira requests per minute (0 for no limit).')
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned Jira changes once and exit without contacting Jira.')
     args = parser.parse_args()
 
     input_file = args.input_file
@@ -63,6 +529,14 @@ def main():
     # Get settings from the configuration file
     issue_mapping_file = config.get('Settings', 'issue_mapping_file', fallback='issue_mapping.json')
     log_file = config.get('Settings', 'log_file', fallback='script.log')
+    rate_per_minute = config.getfloat('Settings', 'rate_per_minute', fallback=0)
+    if args.rate_per_minute is not None:
+        rate_per_minute = args.rate_per_minute
+    rate_limiter = RateLimiter(rate_per_minute) if rate_per_minute > 0 else None
+    # How often to check the input for changes, and how often to sync even if nothing changed
+    poll_interval = config.getfloat('Settings', 'poll_interval', fallback=30)
+    resync_interval = config.getfloat('Settings', 'resync_interval', fallback=3600)
+    journal_file = issue_mapping_file + '.log'
 
     # Set up logging
     logging.basicConfig(
@@ -72,308 +546,389 @@ def main():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-    while True:
-        # Load environment variables from .env file
-        load_dotenv()
-
-        # Get Jira credentials and project key from environment variables
-        jira_server = os.environ.get('JIRA_SERVER')
-        jira_user = os.environ.get('JIRA_USER')
-        jira_token = os.environ.get('JIRA_TOKEN')
-        project_key = os.environ.get('JIRA_PROJECT_KEY')
-
-        if not all([jira_server, jira_user, jira_token, project_key]):
-            logging.error("Jira credentials and project key must be set in the .env file.")
-            sys.exit(1)
-
-        options = {'server': jira_server}
+    if args.dry_run:
         try:
-            jira = JIRA(options, basic_auth=(jira_user, jira_token))
-        except Exception as e:
-            logging.error(f"Failed to connect to Jira: {e}")
+            with open(input_file, 'r', buffering=INPUT_BUFFER_SIZE) as f:
+                root_nodes = parse_logseq(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading input file '{input_file}': {e}", file=sys.stderr)
             sys.exit(1)
+        issue_mapping = load_issue_mapping(issue_mapping_file)
+        MappingJournal(journal_file).replay(issue_mapping)
+        for operation, payload in plan_operations(root_nodes, issue_mapping):
+            print(operation, json.dumps(payload))
+        return
+
+    # Load environment variables from .env file once, send SIGHUP to reload them
+    load_dotenv()
+    jira_server, jira_user, jira_token, project_key, max_workers = read_jira_settings()
+    reload_requested = threading.Event()
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_requested.set())
+
+    jira = None
+    jira_credentials = None
+    last_run_state = None
+    last_run_time = None
+    while True:
+        if reload_requested.is_set():
+            reload_requested.clear()
+            load_dotenv(override=True)
+            jira_server, jira_user, jira_token, project_key, max_workers = read_jira_settings()
+            logging.info("Reloaded settings from the environment")
+            # Sync right away with the new settings
+            last_run_state = None
+
+        # Only sync when the input or the mapping changed since the last run, so idle periods
+        # cost no Jira requests. Still resync now and then to retry anything that failed.
+        input_mtime = get_mtime_ns(input_file)
+        run_state = (input_mtime, get_mtime_ns(issue_mapping_file), get_mtime_ns(journal_file))
+        resync_due = resync_interval > 0 and last_run_time is not None and time.monotonic() - last_run_time >= resync_interval
+        if run_state == last_run_state and not resync_due:
+            time.sleep(poll_interval)
+            continue
+
+        # Reuse the client and its open connections across runs, reconnect only when the
+        # credentials change or the previous client stopped working
+        credentials = (jira_server, jira_user, jira_token)
+        fresh_client = jira is None or credentials != jira_credentials
+        if fresh_client:
+            try:
+                jira = create_jira_client(jira_server, jira_user, jira_token, max(16, max_workers))
+            except Exception as e:
+                logging.error(f"Failed to connect to Jira: {e}")
+                sys.exit(1)
+            jira_credentials = credentials
+            if rate_limiter:
+                rate_limiter.install(jira._session)
 
         # Get the authenticated user's account ID
         try:
-            current_user = jira.myself()
+            current_user = retry(jira.myself)
             account_id = current_user['accountId']
         except Exception as e:
+            if not fresh_client:
+                logging.warning(f"Jira client stopped working, reconnecting: {e}")
+                jira = None
+                continue
             logging.error(f"Failed to get current user info from Jira: {e}")
             sys.exit(1)
 
+        # Look up the Epic custom field IDs of this Jira instance once
+        try:
+            fields = retry(jira.fields)
+            epic_name_field = find_field_id(fields, 'Epic Name')
+            epic_link_field = find_field_id(fields, 'Epic Link')
+            if epic_name_field is None:
+                logging.warning("Jira has no 'Epic Name' field, Epics are created without an Epic Name")
+            if epic_link_field is None:
+                logging.warning("Jira has no 'Epic Link' field, Tasks are created without a link to their Epic")
+        except Exception as e:
+            logging.warning(f"Failed to get fields from Jira, using default Epic field IDs: {e}")
+            epic_name_field = DEFAULT_EPIC_NAME_FIELD
+            epic_link_field = DEFAULT_EPIC_LINK_FIELD
+
         # Load issue mapping from file
-        if os.path.exists(issue_mapping_file):
-            try:
-                with open(issue_mapping_file, 'r') as f:
-                    issue_mapping = json.load(f)
-            except Exception as e:
-                logging.error(f"Error reading issue mapping file '{issue_mapping_file}': {e}")
-                issue_mapping = {}
-        else:
-            issue_mapping = {}
+        issue_mapping = load_issue_mapping(issue_mapping_file)
+        mapping_journal = MappingJournal(journal_file)
+        mapping_journal.replay(issue_mapping)
+        # Guards issue_mapping against concurrent writes from worker threads
+        mapping_lock = threading.Lock()
+
+        # Apply a change to the mapping and journal it right away, entry None removes the path
+        def update_mapping(path, entry):
+            with mapping_lock:
+                if entry is None:
+                    issue_mapping.pop(path, None)
+                else:
+                    issue_mapping[path] = entry
+                mapping_journal.append(path, entry)
 
         try:
-            with open(input_file, 'r') as f:
-                lines = f.readlines()
-        except Exception as e:
+            # Stream the file straight into the parser instead of loading it all first
+            with open(input_file, 'r', buffering=INPUT_BUFFER_SIZE) as f:
+                root_nodes = parse_logseq(f)
+        except (OSError, UnicodeDecodeError) as e:
             logging.error(f"Error reading input file '{input_file}': {e}")
-            time.sleep(300)
+            time.sleep(poll_interval)
             continue
+        except ValueError as e:
+            logging.error(f"{e}. Exiting.")
+            sys.exit(1)
 
-        # Process lines
-        in_logbook = False
-        stack = []
-        root_nodes = []
-        current_node = None
-        current_indent = 0
-
-        for idx, line in enumerate(lines):
-            # Remove the newline at the end and expand tabs
-            line = line.rstrip('\n').expandtabs(4)
-
-            # Skip if line is empty
-            if not line.strip():
-                continue
-
-            # Handle :LOGBOOK: and :END:
-            if ':LOGBOOK:' in line:
-                in_logbook = True
-                continue
-            if ':END:' in line:
-                in_logbook = False
-                continue
-            if in_logbook:
-                continue
-
-            # Determine the indentation level
-            indent = len(line) - len(line.lstrip())
-            content = line.strip()
-
-            # Check if line starts with '- '
-            if content.startswith('- '):
-                # Determine if it's a new node, description, or relation
-                node_content = content[2:].strip()
-                # Check for status
-                status = None
-                if node_content.startswith(('TODO', 'DOING', 'DONE')):
-                    status_and_rest = node_content.split(' ', 1)
-                    status = status_and_rest[0]
-                    if len(status_and_rest) > 1:
-                        node_line = status_and_rest[1].strip()
-                    else:
-                        node_line = ''
-                    # It's a new node
-                    node = Node(indent, node_line)
-                    node.status = status
-                    node.line = node_line
-
-                    # Determine parent node
-                    while stack and indent <= stack[-1].indent:
-                        stack.pop()
-                    if stack:
-                        parent = stack[-1]
-                        node.parent = parent
-                        parent.children.append(node)
-                    else:
-                        root_nodes.append(node)
-                    stack.append(node)
-                    current_node = node
-                    current_indent = indent
-
-                    # Check for levels beyond sub-task
-                    level = len(stack)
-                    if level > 3:
-                        logging.error("Tickets beyond sub-task detected. Exiting.")
-                        sys.exit(1)
-                elif node_content.startswith('#'):
-                    # It's a relation
-                    if current_node:
-                        current_node.relations.append(node_content)
+        # Nodes whose mapped issue could not be updated, these are created again after their level
+        recreate_nodes = []
+
+        # Build the Jira fields for a new issue
+        def build_issue_fields(node):
+            issue_dict = {
+                'project': {'key': project_key},
+                'summary': node.line,
+                'description': node.description_text,
+                'issuetype': {'name': node.type},
+                'assignee': {'id': account_id},  # Assign to authenticated user
+            }
+
+            # For Epics, set the 'Epic Name' field
+            if node.type == EPIC and epic_name_field:
+                issue_dict[epic_name_field] = node.line
+
+            # For Sub-tasks, set the parent
+            if node.type == SUBTASK and node.parent:
+                issue_dict['parent'] = {'key': node.parent.jira_issue.key}
+
+            # For Tasks, set Epic Link if parent is an Epic
+            if node.type == TASK and node.parent and node.parent.type == EPIC and epic_link_field:
+                issue_dict[epic_link_field] = node.parent.jira_issue.key
+
+            return issue_dict
+
+        # Record a newly created issue on the node and in the mapping
+        def record_created_issue(node, issue):
+            node.jira_issue = issue
+            logging.info(f"Created {node.type} '{node.line}' with key {issue.key}")
+            # Add to mapping
+            update_mapping(node.path, {'key': issue.key, 'hash': None})
+
+        # Move a newly created issue to the node's status
+        def set_initial_status(node, sync_hash):
+            issue = node.jira_issue
+            in_sync = True
+            # New issues often start in the target status already, which needs no transition
+            jira_status = get_target_status(node, issue.fields.status.name)
+            if jira_status:
+                try:
+                    if transition_issue_to_status(jira, issue, project_key, node.type, jira_status):
+                        logging.info(f"Set status of {issue.key} to {jira_status}")
                     else:
-                        logging.warning(f"Relation '{node_content}' found with no parent node.")
-                else:
-                    # It's part of the description of the current node
-                    if current_node:
-                        description_line = node_content
-                        current_node.description_lines.append((indent, description_line))
+                        in_sync = False
+                except Exception as e:
+                    logging.error(f"Error setting status for issue {issue.key}: {e}")
+                    in_sync = False
+            if in_sync:
+                update_mapping(node.path, {'key': issue.key, 'hash': sync_hash})
+
+        def link_issue(node, key):
+            try:
+                # Only checks that the issue exists
+                related_issue = prefetched.get(key) or retry(jira.issue, key, fields='summary')
+                jira.create_issue_link(type='Relates', inwardIssue=node.jira_issue.key, outwardIssue=related_issue.key)
+                logging.info(f"Linked {node.jira_issue.key} to {related_issue.key}")
+            except Exception as e:
+                logging.error(f"Error linking issue {node.jira_issue.key} to {key}: {e}")
+
+        # New Epics and Tasks can be created through the bulk endpoint, Sub-tasks go through
+        # create_or_update_issue_single instead
+        def can_bulk_create(node):
+            return not node.existing_key and node.type != SUBTASK
+
+        # Create issues in chunks through the bulk endpoint, returns the nodes that need to be
+        # created one by one because Jira rejected their chunk
+        def bulk_create_issues(nodes):
+            remaining = []
+            for i in range(0, len(nodes), BULK_CREATE_BATCH_SIZE):
+                batch = nodes[i:i + BULK_CREATE_BATCH_SIZE]
+                try:
+                    # Without prefetch the keys are recorded straight from the POST response,
+                    # finish_bulk_created_issue fetches the issues afterwards
+                    results = jira.create_issues([build_issue_fields(node) for node in batch], prefetch=False)
+                except Exception as e:
+                    # Only a 4xx response proves that nothing was created, the chunk can then be
+                    # created one by one. After anything else the issues may exist in Jira while
+                    # they stay unmapped here, so the next run would create them again.
+                    if isinstance(e, JIRAError) and e.status_code is not None and 400 <= e.status_code < 500:
+                        logging.warning(f"Bulk creation of {len(batch)} issues failed, creating them one by one: {e}")
+                        remaining.extend(batch)
                     else:
-                        # No current node, ignore
-                        pass
-            else:
-                # Line does not start with '- ', it could be description or relation
-                if content.startswith('#'):
-                    # It's a relation
-                    if current_node:
-                        current_node.relations.append(content)
+                        summaries = ', '.join(f"'{node.line}'" for node in batch)
+                        logging.error(
+                            f"Bulk creation of {len(batch)} issues failed and may have reached Jira: {e}. "
+                            f"Check for these issues, and add any that exist to the issue mapping, before "
+                            f"the next run creates them again: {summaries}"
+                        )
+                    continue
+                for node, result in zip(batch, results):
+                    if result['status'] == 'Success':
+                        record_created_issue(node, result['issue'])
                     else:
-                        logging.warning(f"Relation '{content}' found with no parent node.")
-                else:
-                    # It's a description line
-                    if current_node:
-                        current_node.description_lines.append((indent, content))
+                        logging.error(f"Error creating issue '{node.line}': {result['error']}")
+            return remaining
+
+        # Fetch an issue created without prefetch, then move it to the node's status
+        def finish_created_issue(node, sync_hash):
+            try:
+                node.jira_issue = retry(jira.issue, node.jira_issue.key, fields=SYNC_FIELDS)
+            except Exception as e:
+                # The key is already mapped, so the next run updates the issue instead
+                logging.error(f"Error fetching created issue {node.jira_issue.key}: {e}")
+                return
+            set_initial_status(node, sync_hash)
+
+        def finish_bulk_created_issue(node):
+            finish_created_issue(node, compute_sync_hash(node))
+
+        # Push local changes to an issue that is already in the mapping
+        def update_existing_issue(node, sync_hash):
+            issue_key = node.existing_key
+            issue = node.prefetched_issue or retry(jira.issue, issue_key, fields=SYNC_FIELDS)
+            node.jira_issue = issue
+            logging.info(f"Processing {node.type} '{node.line}' with key {issue.key}")
+
+            # Only push description and status if they changed since the last sync
+            in_sync = True
+            if node.synced_hash != sync_hash:
+                # Retrieve current description and status
+                current_description = issue.fields.description or ''
+                current_status = issue.fields.status.name
+
+                # Compare descriptions, ignoring whitespace differences Jira may introduce
+                if normalize_whitespace(current_description) != normalize_whitespace(node.description_text):
+                    # Update description
+                    retry(issue.update, fields={'description': node.description_text})
+                    logging.info(f"Updated description for {issue.key}")
+
+                # Map custom status to Jira status
+                jira_status = get_target_status(node, current_status)
+                if jira_status:
+                    # Transition issue to new status
+                    if transition_issue_to_status(jira, issue, project_key, node.type, jira_status):
+                        logging.info(f"Updated status of {issue.key} to {jira_status}")
                     else:
-                        # No current node, ignore
-                        pass
-
-        # Assign types to nodes and compute paths
-        def assign_types_and_paths(node, level=1, path=''):
-            if level == 1:
-                node.type = 'Epic'
-            elif level == 2:
-                node.type = 'Task'
-            elif level == 3:
-                node.type = 'Sub-task'
-            node.path = path + '/' + node.line
-            # Build the description text here
-            node.description_text = build_description_text(node.description_lines)
-            node.description_text = convert_markdown_links_to_jira(node.description_text)
-            for child in node.children:
-                assign_types_and_paths(child, level+1, node.path)
-
-        for root in root_nodes:
-            assign_types_and_paths(root)
-
-        # Map custom statuses to Jira statuses
-        status_mapping = {
-            'TODO': 'Backlog',
-            'DOING': 'In Progress',
-            'DONE': 'Done'
-        }
-
-        # Now, create or update the issues in Jira
-        def create_or_update_issue(node):
-            # Check if issue exists in mapping
-            issue_key = issue_mapping.get(node.path)
-            if issue_key:
-                # Issue exists, update it
-                try:
-                    issue = jira.issue(issue_key)
-                    node.jira_issue = issue
-                    logging.info(f"Processing {node.type} '{node.line}' with key {issue.key}")
-
-                    # Retrieve current description and status
-                    current_description = issue.fields.description or ''
-                    current_status = issue.fields.status.name
-
-                    # Compare descriptions
-                    if current_description.strip() != node.description_text.strip():
-                        # Update description
-                        issue.update(fields={'description': node.description_text})
-                        logging.info(f"Updated description for {issue.key}")
-
-                    # Map custom status to Jira status
-                    if node.status and node.status in status_mapping:
-                        jira_status = status_mapping[node.status]
-                        if current_status != jira_status:
-                            # Transition issue to new status
-                            transitions = jira.transitions(issue)
-                            transition_id = None
-                            for t in transitions:
-                                if t['name'] == jira_status:
-                                    transition_id = t['id']
-                                    break
-                            if transition_id:
-                                jira.transition_issue(issue, transition_id)
-                                logging.info(f"Updated status of {issue.key} to {jira_status}")
-                    # Update assignee if necessary
-                    if issue.fields.assignee is None or issue.fields.assignee.accountId != account_id:
-                        issue.update(fields={'assignee': {'id': account_id}})
-                        logging.info(f"Assigned {issue.key} to current user")
+                        in_sync = False
+                if in_sync:
+                    update_mapping(node.path, {'key': issue_key, 'hash': sync_hash})
+            # Update assignee if necessary
+            if issue.fields.assignee is None or issue.fields.assignee.accountId != account_id:
+                retry(issue.update, fields={'assignee': {'id': account_id}})
+                logging.info(f"Assigned {issue.key} to current user")
+
+        # Create a single issue, used where the bulk endpoint doesn't apply
+        def create_new_issue(node, sync_hash):
+            issue_dict = build_issue_fields(node)
+
+            # Create the issue. Not retried, a request that failed after reaching Jira could
+            # otherwise create a duplicate. Without prefetch the POST is the only request, so
+            # the key is recorded before anything else can fail.
+            try:
+                issue = jira.create_issue(fields=issue_dict, prefetch=False)
+            except Exception as e:
+                logging.error(f"Error creating issue '{node.line}': {e}")
+                return
+            record_created_issue(node, issue)
 
-                except Exception as e:
-                    logging.error(f"Error updating issue {issue_key}: {e}")
-                    # Remove from mapping and recreate
-                    del issue_mapping[node.path]
-                    create_or_update_issue(node)
-                    return
-            else:
+            # Set status if needed
+            finish_created_issue(node, sync_hash)
+
+        # Now, create or update the issues in Jira (a single node, children are handled by the caller)
+        def create_or_update_issue_single(node):
+            sync_hash = compute_sync_hash(node)
+            # Check if issue exists in mapping
+            if not node.existing_key:
                 # Issue does not exist, create it
-                issue_dict = {
-                    'project': {'key': project_key},
-                    'summary': node.line,
-                    'description': node.description_text,
-                    'issuetype': {'name': node.type},
-                    'assignee': {'id': account_id},  # Assign to authenticated user
-                }
-
-                # For Epics, set the 'Epic Name' field (adjust customfield ID as per your Jira instance)
-                if node.type == 'Epic':
-                    # Adjust the custom field ID as per your Jira instance
-                    epic_name_field = 'customfield_10011'  # Replace with your 'Epic Name' field ID
-                    issue_dict[epic_name_field] = node.line
-
-                # For Sub-tasks, set the parent
-                if node.type == 'Sub-task' and node.parent:
-                    issue_dict['parent'] = {'key': node.parent.jira_issue.key}
-
-                # For Tasks, set Epic Link if parent is an Epic
-                if node.type == 'Task' and node.parent and node.parent.type == 'Epic':
-                    # Adjust the custom field ID as per your Jira instance
-                    epic_link_field = 'customfield_10014'  # Replace with your 'Epic Link' field ID
-                    issue_dict[epic_link_field] = node.parent.jira_issue.key
-
-                # Create the issue
-                try:
-                    issue = jira.create_issue(fields=issue_dict)
-                    node.jira_issue = issue
-                    logging.info(f"Created {node.type} '{node.line}' with key {issue.key}")
-                    # Add to mapping
-                    issue_mapping[node.path] = issue.key
-                except Exception as e:
-                    logging.error(f"Error creating issue '{node.line}': {e}")
-                    return
-
-                # Set status if needed
-                if node.status and node.status in status_mapping:
-                    jira_status = status_mapping[node.status]
-                    transitions = jira.transitions(issue)
-                    transition_id = None
-                    for t in transitions:
-                        if t['name'] == jira_status:
-                            transition_id = t['id']
-                            break
-                    if transition_id:
-                        try:
-                            jira.transition_issue(issue, transition_id)
-                            logging.info(f"Set status of {issue.key} to {jira_status}")
-                        except Exception as e:
-                            logging.error(f"Error setting status for issue {issue.key}: {e}")
-
-            # Handle relations
-            for relation in node.relations:
-                # Implement relation handling
-                logging.info(f"Handling relation '{relation}' for issue {node.jira_issue.key}")
-                # Extract issue keys from relation
-                related_issue_keys = re.findall(r'#([A-Z]+-\d+)', relation)
-                for key in related_issue_keys:
-                    try:
-                        related_issue = jira.issue(key)
-                        jira.create_issue_link(type='Relates', inwardIssue=node.jira_issue.key, outwardIssue=related_issue.key)
-                        logging.info(f"Linked {node.jira_issue.key} to {related_issue.key}")
-                    except Exception as e:
-                        logging.error(f"Error linking issue {node.jira_issue.key} to {key}: {e}")
-
-            # Create or update child issues
-            for child in node.children:
-                # For Sub-tasks, set parent issue
-                if child.type == 'Sub-task':
-                    child.parent = node
-                create_or_update_issue(child)
-
-        for root in root_nodes:
-            create_or_update_issue(root)
-
-        # Save issue mapping to file
-        try:
-            with open(issue_mapping_file, 'w') as f:
-                json.dump(issue_mapping, f, indent=4)
-            logging.info(f"Issue mapping saved to '{issue_mapping_file}'")
-        except Exception as e:
-            logging.error(f"Error saving issue mapping to '{issue_mapping_file}': {e}")
+                create_new_issue(node, sync_hash)
+                return
+            try:
+                update_existing_issue(node, sync_hash)
+            except Exception as e:
+                logging.error(f"Error updating issue {node.existing_key}: {e}")
+                # Remove from mapping and queue the node to be recreated
+                node.jira_issue = None
+                node.existing_key = None
+                node.prefetched_issue = None
+                update_mapping(node.path, None)
+                with mapping_lock:
+                    recreate_nodes.append(node)
+
+        # Group nodes by tree level so every parent exists in Jira before its children are synced
+        levels = group_by_level(root_nodes)
+
+        # Attach mapping entries to the nodes once, then fetch all mapped and related issues
+        # with a few JQL searches instead of one request each
+        prefetch_keys = {}  # Insertion-ordered set
+        for level in levels:
+            for node in level:
+                entry = issue_mapping.get(node.path)
+                if entry:
+                    node.existing_key = entry['key']
+                    node.synced_hash = entry.get('hash')
+                    prefetch_keys[node.existing_key] = None
+                for relation in node.relations:
+                    prefetch_keys.update(dict.fromkeys(_REL_RE.findall(relation)))
+        prefetched = prefetch_issues(jira, list(prefetch_keys))
+        for level in levels:
+            for node in level:
+                if node.existing_key:
+                    node.prefetched_issue = prefetched.get(node.existing_key)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+
+        # Run (function, *args) tasks, concurrently when a thread pool is configured
+        def run_tasks(tasks):
+            if executor is None:
+                for func, *args in tasks:
+                    func(*args)
+                return
+            futures = [executor.submit(*task) for task in tasks]
+            for future in as_completed(futures):
+                future.result()
+
+        def sync_nodes(nodes):
+            bulk_nodes = []
+            single_nodes = []
+            for node in nodes:
+                # A new issue can't be created under a parent that failed to sync, which
+                # skips the rest of that subtree as well
+                if not node.existing_key and node.parent and node.parent.jira_issue is None:
+                    logging.error(f"Skipping {node.type} '{node.line}', its parent '{node.parent.line}' has no Jira issue")
+                    continue
+                (bulk_nodes if can_bulk_create(node) else single_nodes).append(node)
+            single_nodes.extend(bulk_create_issues(bulk_nodes))
+            # Siblings are independent, so the rest of the level is synced concurrently
+            tasks = [(finish_bulk_created_issue, node) for node in bulk_nodes if node.jira_issue]
+            tasks.extend((create_or_update_issue_single, node) for node in single_nodes)
+            run_tasks(tasks)
 
-        # Sleep for 5 minutes before the next run
-        logging.info("Waiting for 5 minutes before the next run...")
-        time.sleep(300)  # 300 seconds = 5 minutes
+        try:
+            for depth, level in enumerate(levels, start=1):
+                pending = level
+                while pending:
+                    recreate_nodes.clear()
+                    sync_nodes(pending)
+                    # Recreated nodes are no longer mapped, so this runs at most twice per level
+                    pending = list(recreate_nodes)
+                logging.info(f"Synced level {depth} of {len(levels)} ({len(level)} issues)")
+
+            # Handle relations once all issues exist, each link is an independent request
+            link_tasks = []
+            for level in levels:
+                for node in level:
+                    if not node.jira_issue:
+                        continue
+                    for relation in node.relations:
+                        logging.info(f"Handling relation '{relation}' for issue {node.jira_issue.key}")
+                    # Only create links that don't exist yet
+                    for key in get_new_link_keys(node, get_linked_keys(node.jira_issue)):
+                        link_tasks.append((link_issue, node, key))
+            run_tasks(link_tasks)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # Every change is already in the journal, fold it into the mapping file once it grows large
+        if mapping_journal.line_count > JOURNAL_COMPACT_LINES:
+            try:
+                save_issue_mapping(issue_mapping_file, issue_mapping)
+                mapping_journal.truncate()
+                logging.info(f"Issue mapping saved to '{issue_mapping_file}'")
+            except Exception as e:
+                logging.error(f"Error saving issue mapping to '{issue_mapping_file}': {e}")
+
+        # Remember what this run saw. The input mtime is from before parsing, so edits made
+        # during the run trigger another one.
+        last_run_state = (input_mtime, get_mtime_ns(issue_mapping_file), get_mtime_ns(journal_file))
+        last_run_time = time.monotonic()
+        logging.info(f"Waiting for changes to '{input_file}'...")
+        time.sleep(poll_interval)
 
 if __name__ == '__main__':
     main()